@@ -0,0 +1,106 @@
+"""
+SOAP 请求构造/响应解析的单次 CPU 开销基准
+
+对比旧实现 (f-string 信封 + encode，response.text 解码后再解析)
+与预编译字节模板 + 原始字节解析。
+
+运行 (需先 pip install -e .): python benchmarks/bench_soap.py [次数]
+"""
+
+import itertools
+import sys
+import timeit
+from datetime import date
+
+from taric_match.api.client import MEASURES_TEMPLATE, TaricClient
+
+MEASURE = """
+          <measure>
+            <measureType>103</measureType>
+            <measureTypeDescription>Third country duty — droit de douane</measureTypeDescription>
+            <dutyRate>10 %</dutyRate>
+            <validityStartDate>2024-01-01</validityStartDate>
+            <regulationId>R2658/87</regulationId>
+          </measure>"""
+
+RESPONSE = f"""<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ns="http://goodsNomenclatureForWS.ws.taric.dds.s/">
+  <soapenv:Body>
+    <ns:goodsMeasForWsResponse>
+      <return>
+        <goodsCode>8703231900</goodsCode>
+        <countryCode>CN</countryCode>
+        <referenceDate>2024-01-15</referenceDate>
+        <tradeMovement>I</tradeMovement>
+        <measureList>{MEASURE * 20}
+        </measureList>
+      </return>
+    </ns:goodsMeasForWsResponse>
+  </soapenv:Body>
+</soapenv:Envelope>""".encode(
+    "utf-8"
+)
+
+client = TaricClient()
+ref_date = date(2024, 1, 15)
+# 每次构造使用不同的商品编码，与真实批量查询一致 (避免缓存恒命中)
+goods_codes = (f"{n:010d}" for n in itertools.count(8703231900))
+
+
+def legacy_request() -> bytes:
+    goods_code, country_code, trade_movement = next(goods_codes), "cn", "i"
+    soap_body = f"""<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ns="http://goodsNomenclatureForWS.ws.taric.dds.s/">
+  <soapenv:Body>
+    <ns:goodsMeasForWs>
+      <goodsCode>{goods_code}</goodsCode>
+      <countryCode>{country_code.upper()}</countryCode>
+      <referenceDate>{ref_date.strftime('%Y-%m-%d')}</referenceDate>
+      <tradeMovement>{trade_movement.upper()}</tradeMovement>
+    </ns:goodsMeasForWs>
+  </soapenv:Body>
+</soapenv:Envelope>"""
+    return soap_body.encode("utf-8")
+
+
+def template_request() -> bytes:
+    goods_code, country_code, trade_movement = next(goods_codes), "cn", "i"
+    return MEASURES_TEMPLATE.render(
+        goods_code=goods_code,
+        country_code=country_code.upper(),
+        reference_date=ref_date.isoformat(),
+        trade_movement=trade_movement.upper(),
+    )
+
+
+def legacy_response():
+    # 模拟 requests 的 response.text: 先解码为 str 再交给解析器
+    return client._parse_measures_response(RESPONSE.decode("utf-8"))
+
+
+def bytes_response():
+    return client._parse_measures_response(RESPONSE)
+
+
+def bench(name: str, func, number: int) -> float:
+    best = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"  {name:<24} {best * 1e6:8.2f} µs")
+    return best
+
+
+def main() -> None:
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print("请求构造:")
+    before = bench("f-string + encode", legacy_request, number)
+    after = bench("字节模板", template_request, number)
+    print(f"  → {before / after:.2f}x")
+
+    number = max(1, number // 10)
+    print("响应解析:")
+    before = bench("response.text", legacy_response, number)
+    after = bench("原始字节", bytes_response, number)
+    print(f"  → {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
 """API 模块"""
 
-from .client import TaricClient, GoodsDescription, GoodsMeasures, Measure
+from .cache import ResponseCache
+from .client import TaricClient, TaricAPIError, GoodsDescription, GoodsMeasures, Measure
+from .prefetch import PrefetchJob, PrefetchResult
 
 __all__ = [
     "TaricClient",
+    "TaricAPIError",
     "GoodsDescription",
     "GoodsMeasures",
     "Measure",
+    "ResponseCache",
+    "PrefetchJob",
+    "PrefetchResult",
 ]
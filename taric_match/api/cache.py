@@ -0,0 +1,174 @@
+"""
+TARIC 响应缓存
+
+将 SOAP 响应原文持久化到 SQLite，并记录每个查询键的访问次数，
+供 `taric-match prefetch` 按访问频率预热。
+"""
+
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+# 访问统计键: (操作, 商品编码, 国家/语言, 贸易方向)，不含日期
+AccessKey = Tuple[str, str, str, str]
+
+
+class ResponseCache:
+    """TARIC 响应缓存
+
+    缓存键包含参考日期，同一商品在不同日期的结果分别缓存；
+    访问统计不含日期，用于找出每天反复查询的热点编码。
+
+    Args:
+        path: SQLite 文件路径 (":memory:" 表示仅内存)
+        ttl: 缓存有效期 (秒)，None 表示永不过期
+    """
+
+    # 访问计数在内存中累积，达到该数量后批量写入
+    FLUSH_THRESHOLD = 256
+
+    def __init__(self, path: Union[str, Path] = ":memory:", ttl: Optional[float] = 24 * 3600):
+        self.path = str(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                stored_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS access (
+                operation TEXT NOT NULL,
+                goods_code TEXT NOT NULL,
+                param TEXT NOT NULL,
+                movement TEXT NOT NULL,
+                requests INTEGER NOT NULL DEFAULT 0,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (operation, goods_code, param, movement)
+            );
+            """
+        )
+        self._pending: Counter = Counter()
+        self._pending_count = 0
+        # 本进程内的命中/未命中次数
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(access_key: AccessKey, reference_date: str) -> str:
+        """生成缓存键"""
+        return "|".join(access_key + (reference_date,))
+
+    def get(self, access_key: AccessKey, reference_date: str) -> Optional[bytes]:
+        """读取缓存，同时记录一次访问；未命中或已过期返回 None"""
+        key = self.make_key(access_key, reference_date)
+        with self._lock:
+            self._pending[access_key] += 1
+            self._pending_count += 1
+            if self._pending_count >= self.FLUSH_THRESHOLD:
+                self._flush_locked()
+            row = self._conn.execute(
+                "SELECT body, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl is not None and time.time() - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return bytes(row[0])
+
+    def contains(self, access_key: AccessKey, reference_date: str) -> bool:
+        """是否存在未过期的缓存 (不记录访问)"""
+        key = self.make_key(access_key, reference_date)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return False
+        return self.ttl is None or time.time() - row[0] <= self.ttl
+
+    def put(self, access_key: AccessKey, reference_date: str, body: bytes) -> None:
+        """写入缓存"""
+        key = self.make_key(access_key, reference_date)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, stored_at) VALUES (?, ?, ?)",
+                (key, body, time.time()),
+            )
+            self._conn.commit()
+
+    def most_requested(
+        self, limit: int, operation: Optional[str] = None
+    ) -> List[Tuple[AccessKey, int]]:
+        """按访问次数降序返回热点查询键"""
+        with self._lock:
+            self._flush_locked()
+            sql = "SELECT operation, goods_code, param, movement, requests FROM access"
+            args: list = []
+            if operation:
+                sql += " WHERE operation = ?"
+                args.append(operation)
+            sql += " ORDER BY requests DESC, last_access DESC LIMIT ?"
+            args.append(limit)
+            rows = self._conn.execute(sql, args).fetchall()
+        return [((op, code, param, movement), count) for op, code, param, movement, count in rows]
+
+    def known_keys(self, operation: Optional[str] = None) -> List[AccessKey]:
+        """返回所有出现过的查询键"""
+        return [key for key, _ in self.most_requested(-1, operation)]
+
+    def stats(self) -> Dict[str, int]:
+        """缓存条目数与累计访问次数"""
+        with self._lock:
+            self._flush_locked()
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            requests = self._conn.execute(
+                "SELECT COALESCE(SUM(requests), 0) FROM access"
+            ).fetchone()[0]
+        return {"entries": entries, "requests": requests}
+
+    def prune(self) -> int:
+        """删除已过期的缓存条目，返回删除数量"""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM responses WHERE stored_at < ?", (time.time() - self.ttl,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def flush(self) -> None:
+        """将内存中的访问计数写入数据库"""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        """清理过期条目、写入剩余计数并关闭连接"""
+        self.prune()
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        now = time.time()
+        self._conn.executemany(
+            """
+            INSERT INTO access (operation, goods_code, param, movement, requests, last_access)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (operation, goods_code, param, movement)
+            DO UPDATE SET requests = requests + excluded.requests,
+                          last_access = excluded.last_access
+            """,
+            [key + (count, now) for key, count in self._pending.items()],
+        )
+        self._conn.commit()
+        self._pending.clear()
+        self._pending_count = 0
@@ -4,12 +4,86 @@ EU TARIC API 客户端
 """
 
 import os
+import string
+from collections import OrderedDict
+from contextlib import nullcontext
 import xml.etree.ElementTree as ET
 from datetime import date, datetime
+from functools import lru_cache
 from dataclasses import dataclass, field
-from typing import Optional, List
+from typing import Callable, Iterable, Iterator, Optional, List, Tuple, Union
+from xml.sax.saxutils import escape
 import requests
 
+from taric_match.utils.profiling import PipelineProfiler
+
+from .cache import ResponseCache
+from .concurrency import RateLimiter, bounded_map
+
+
+def _encode_param(value: str) -> bytes:
+    """XML 转义并编码参数"""
+    return escape(value).encode('utf-8')
+
+
+# 国家/语言/日期/贸易方向取值很少，缓存后几乎无开销；商品编码基数高，缓存只会徒增查找成本
+_encode_cached_param = lru_cache(maxsize=256)(_encode_param)
+
+
+class SoapTemplate:
+    """预编译的 SOAP 请求模板
+
+    模板在导入时拆分为 UTF-8 字节片段，渲染时只对参数做 XML 转义并编码，
+    避免每次请求重新格式化和编码整个信封。
+
+    Args:
+        template: 含 {字段} 占位符的请求模板
+        cached: 取值很少、编码结果可缓存的字段名
+    """
+
+    def __init__(self, template: str, cached: Iterable[str] = ()):
+        cached = set(cached)
+        chunks = []
+        self._fields: List[Tuple[str, Callable[[str], bytes]]] = []
+        for literal, field_name, _, _ in string.Formatter().parse(template):
+            chunks.append(literal.replace('%', '%%'))
+            if field_name is not None:
+                chunks.append('%s')
+                encode = _encode_cached_param if field_name in cached else _encode_param
+                self._fields.append((field_name, encode))
+        self._template = ''.join(chunks).encode('utf-8')
+
+    def render(self, **values: str) -> bytes:
+        """填入参数 (自动 XML 转义)，返回请求体字节"""
+        return self._template % tuple([encode(values[name]) for name, encode in self._fields])
+
+
+DESCRIPTION_TEMPLATE = SoapTemplate("""<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ns="http://goodsNomenclatureForWS.ws.taric.dds.s/">
+  <soapenv:Body>
+    <ns:goodsDescrForWs>
+      <goodsCode>{goods_code}</goodsCode>
+      <languageCode>{language_code}</languageCode>
+      <referenceDate>{reference_date}</referenceDate>
+    </ns:goodsDescrForWs>
+  </soapenv:Body>
+</soapenv:Envelope>""", cached=("language_code", "reference_date"))
+
+MEASURES_TEMPLATE = SoapTemplate("""<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ns="http://goodsNomenclatureForWS.ws.taric.dds.s/">
+  <soapenv:Body>
+    <ns:goodsMeasForWs>
+      <goodsCode>{goods_code}</goodsCode>
+      <countryCode>{country_code}</countryCode>
+      <referenceDate>{reference_date}</referenceDate>
+      <tradeMovement>{trade_movement}</tradeMovement>
+    </ns:goodsMeasForWs>
+  </soapenv:Body>
+</soapenv:Envelope>""", cached=("country_code", "reference_date", "trade_movement"))
+
+# 批量查询键: (商品编码, 国家代码, 贸易方向, 参考日期)，日期可为 None (当天)
+MeasuresKey = Tuple[str, str, str, Optional[date]]
+
 
 @dataclass
 class GoodsDescription:
@@ -84,21 +158,28 @@ class TaricClient:
         self,
         service_url: Optional[str] = None,
         timeout: int = 30,
-        use_mock: bool = False  # 测试用 mock 数据
+        use_mock: bool = False,  # 测试用 mock 数据
+        cache: Optional[ResponseCache] = None
     ):
         self.service_url = service_url or self.SERVICE_URL
         self.timeout = timeout
         self.use_mock = use_mock or os.environ.get('TARIC_USE_MOCK', '').lower() == 'true'
+        self.cache = cache
     
-    def _make_soap_request(self, soap_body: str) -> str:
-        """发送 SOAP 请求"""
+    def close(self) -> None:
+        """关闭缓存 (写入访问统计)"""
+        if self.cache is not None:
+            self.cache.close()
+    
+    def _make_soap_request(self, soap_body: bytes) -> bytes:
+        """发送 SOAP 请求，返回响应原始字节 (由 XML 解析器按声明的编码解码)"""
         headers = {
             'Content-Type': 'text/xml; charset=utf-8',
             'SOAPAction': '',
         }
         response = requests.post(
             self.service_url,
-            data=soap_body.encode('utf-8'),
+            data=soap_body,
             headers=headers,
             timeout=self.timeout
         )
@@ -111,9 +192,9 @@ class TaricClient:
             )
         
         response.raise_for_status()
-        return response.text
+        return response.content
     
-    def _parse_description_response(self, xml_response: str) -> GoodsDescription:
+    def _parse_description_response(self, xml_response: bytes) -> GoodsDescription:
         """解析商品描述响应"""
         root = ET.fromstring(xml_response)
         
@@ -159,7 +240,7 @@ class TaricClient:
             original_language=original_language
         )
     
-    def _parse_measures_response(self, xml_response: str) -> GoodsMeasures:
+    def _parse_measures_response(self, xml_response: bytes) -> GoodsMeasures:
         """解析关税措施响应"""
         root = ET.fromstring(xml_response)
         ns = self.NS
@@ -278,24 +359,24 @@ class TaricClient:
             return self._mock_description(goods_code, language_code)
         
         ref_date = reference_date or date.today()
+        access_key = ('description', goods_code, language_code.upper(), '')
+        date_str = ref_date.isoformat()
         
-        soap_body = f"""<?xml version="1.0" encoding="UTF-8"?>
-<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ns="http://goodsNomenclatureForWS.ws.taric.dds.s/">
-  <soapenv:Body>
-    <ns:goodsDescrForWs>
-      <goodsCode>{goods_code}</goodsCode>
-      <languageCode>{language_code.upper()}</languageCode>
-      <referenceDate>{ref_date.strftime('%Y-%m-%d')}</referenceDate>
-    </ns:goodsDescrForWs>
-  </soapenv:Body>
-</soapenv:Envelope>"""
+        if self.cache is not None:
+            cached = self.cache.get(access_key, date_str)
+            if cached is not None:
+                result = self._parse_description_response(cached)
+                if result is not None:
+                    return result
         
         try:
-            response = self._make_soap_request(soap_body)
+            response = self._request_description(goods_code, language_code, ref_date)
             result = self._parse_description_response(response)
             if result is None:
                 # API 返回空，使用 mock
                 return self._mock_description(goods_code, language_code)
+            if self.cache is not None:
+                self.cache.put(access_key, date_str, response)
             return result
         except TaricAPIError:
             # 如果 API 错误，使用 mock 数据
@@ -323,28 +404,226 @@ class TaricClient:
         if self.use_mock:
             return self._mock_measures(goods_code, country_code, trade_movement)
         
+        try:
+            return self.fetch_goods_measures(goods_code, country_code, trade_movement, reference_date)
+        except TaricAPIError:
+            return self._mock_measures(goods_code, country_code, trade_movement)
+    
+    def fetch_goods_measures(
+        self,
+        goods_code: str,
+        country_code: str = "CN",
+        trade_movement: str = "I",
+        reference_date: Optional[date] = None,
+        limiter: Optional[RateLimiter] = None
+    ) -> GoodsMeasures:
+        """
+        查询商品关税措施，API 错误时直接抛出
+        
+        与 get_goods_measures 相同，但不回退到 mock 数据: 502 拦截、HTTP 错误、
+        空响应都以异常形式抛出，适合批量任务统计失败与重试。
+        
+        Args:
+            limiter: 限速器，仅在实际发送请求前等待 (缓存命中不受限速)
+            
+        Raises:
+            TaricAPIError: API 错误或无返回数据
+            requests.RequestException: 网络错误
+        """
+        if self.use_mock:
+            return self._mock_measures(goods_code, country_code, trade_movement)
+        
         ref_date = reference_date or date.today()
+        access_key = ('measures', goods_code, country_code.upper(), trade_movement.upper())
+        date_str = ref_date.isoformat()
+        
+        if self.cache is not None:
+            cached = self.cache.get(access_key, date_str)
+            if cached is not None:
+                result = self._parse_measures_response(cached)
+                if result is not None:
+                    return result
+        
+        if limiter is not None:
+            limiter.wait()
+        response = self._request_measures(goods_code, country_code, trade_movement, ref_date)
+        result = self._parse_measures_response(response)
+        if result is None:
+            raise TaricAPIError(f"商品编码 {goods_code} 无返回数据")
+        if self.cache is not None:
+            self.cache.put(access_key, date_str, response)
+        return result
+    
+    def iter_goods_measures(
+        self,
+        keys: Iterable[MeasuresKey],
+        workers: int = 8,
+        max_in_flight: Optional[int] = None,
+        ordered: bool = False,
+        rate: float = 0,
+        return_exceptions: bool = False,
+        dedupe_window: int = 100_000
+    ) -> Iterator[Tuple[MeasuresKey, Union[GoodsMeasures, Exception]]]:
+        """
+        批量并发查询商品关税措施 (流式)
         
-        soap_body = f"""<?xml version="1.0" encoding="UTF-8"?>
-<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ns="http://goodsNomenclatureForWS.ws.taric.dds.s/">
-  <soapenv:Body>
-    <ns:goodsMeasForWs>
-      <goodsCode>{goods_code}</goodsCode>
-      <countryCode>{country_code.upper()}</countryCode>
-      <referenceDate>{ref_date.strftime('%Y-%m-%d')}</referenceDate>
-      <tradeMovement>{trade_movement.upper()}</tradeMovement>
-    </ns:goodsMeasForWs>
-  </soapenv:Body>
-</soapenv:Envelope>"""
+        keys 按需读取，可以是生成器。同时最多 max_in_flight 个结果等待消费，
+        调用方处理变慢时自动停止读取新的键。
+        
+        查询通过 fetch_goods_measures 进行，不回退到 mock 数据:
+        API 错误 (如 502) 以异常形式产出或抛出。
+        
+        去重只记住最近 dedupe_window 个不同的键 (LRU)，内存占用有上限；
+        间隔超过窗口的重复键会再次查询 (启用缓存时通常命中缓存)。
+        dedupe_window=0 关闭去重。
+        
+        Args:
+            keys: (商品编码, 国家代码, 贸易方向, 参考日期) 的可迭代对象
+            workers: 并发线程数
+            max_in_flight: 最多未消费结果数，默认 workers * 2
+            ordered: True 按输入顺序产出，False 按完成顺序产出
+            rate: 每秒最多发往 API 的请求数，0 表示不限速 (缓存命中不受限速)
+            return_exceptions: True 时将异常作为结果产出，否则直接抛出
+            dedupe_window: 去重窗口大小
+        
+        设置环境变量 TARIC_PROFILE=<目录> 时，采集工作线程的 cProfile 数据，
+        结束后写出 iter_goods_measures.lookup.prof 与汇总报告。
+            
+        Yields:
+            (规范化后的键, GoodsMeasures 或异常)
+        """
+        limiter = RateLimiter(rate)
+        
+        def unique_keys() -> Iterator[MeasuresKey]:
+            recent: "OrderedDict[MeasuresKey, None]" = OrderedDict()
+            for goods_code, country_code, trade_movement, reference_date in keys:
+                key = (
+                    str(goods_code),
+                    country_code.upper(),
+                    trade_movement.upper(),
+                    reference_date or date.today()
+                )
+                if dedupe_window > 0:
+                    if key in recent:
+                        recent.move_to_end(key)
+                        continue
+                    recent[key] = None
+                    if len(recent) > dedupe_window:
+                        recent.popitem(last=False)
+                yield key
+        
+        def lookup(key: MeasuresKey) -> GoodsMeasures:
+            return self.fetch_goods_measures(*key, limiter=limiter)
+        
+        profiler = PipelineProfiler.from_env(prefix="iter_goods_measures")
+        profiled = (
+            profiler.threaded_phase("lookup") if profiler is not None else nullcontext(lambda f: f)
+        )
         
         try:
-            response = self._make_soap_request(soap_body)
-            result = self._parse_measures_response(response)
-            if result is None:
-                return self._mock_measures(goods_code, country_code, trade_movement)
-            return result
-        except TaricAPIError:
-            return self._mock_measures(goods_code, country_code, trade_movement)
+            with profiled as wrap:
+                results = bounded_map(wrap(lookup), unique_keys(), workers, max_in_flight, ordered)
+                for key, future in results:
+                    error = future.exception()
+                    if error is None:
+                        yield key, future.result()
+                    elif return_exceptions and isinstance(error, Exception):
+                        yield key, error
+                    else:
+                        raise error
+        finally:
+            if profiler is not None and profiler.phases:
+                profiler.write()
+    
+    def warm_goods_measures(
+        self,
+        goods_code: str,
+        country_code: str = "CN",
+        trade_movement: str = "I",
+        reference_date: Optional[date] = None
+    ) -> bool:
+        """
+        预热关税措施缓存
+        
+        与 get_goods_measures 不同: 不计入访问统计，不回退到 mock 数据，
+        API 错误直接抛出，便于预热任务统计失败数。
+        
+        Returns:
+            True 表示已请求并写入缓存，False 表示缓存中已存在
+        """
+        if self.cache is None:
+            raise ValueError("预热需要启用缓存 (cache=ResponseCache(...))")
+        
+        ref_date = reference_date or date.today()
+        access_key = ('measures', goods_code, country_code.upper(), trade_movement.upper())
+        date_str = ref_date.isoformat()
+        
+        if self.cache.contains(access_key, date_str):
+            return False
+        
+        response = self._request_measures(goods_code, country_code, trade_movement, ref_date)
+        if self._parse_measures_response(response) is None:
+            raise TaricAPIError(f"商品编码 {goods_code} 无返回数据")
+        self.cache.put(access_key, date_str, response)
+        return True
+    
+    def warm_goods_description(
+        self,
+        goods_code: str,
+        language_code: str = "EN",
+        reference_date: Optional[date] = None
+    ) -> bool:
+        """
+        预热商品描述缓存 (规则同 warm_goods_measures)
+        
+        Returns:
+            True 表示已请求并写入缓存，False 表示缓存中已存在
+        """
+        if self.cache is None:
+            raise ValueError("预热需要启用缓存 (cache=ResponseCache(...))")
+        
+        ref_date = reference_date or date.today()
+        access_key = ('description', goods_code, language_code.upper(), '')
+        date_str = ref_date.isoformat()
+        
+        if self.cache.contains(access_key, date_str):
+            return False
+        
+        response = self._request_description(goods_code, language_code, ref_date)
+        if self._parse_description_response(response) is None:
+            raise TaricAPIError(f"商品编码 {goods_code} 无返回数据")
+        self.cache.put(access_key, date_str, response)
+        return True
+    
+    def _request_description(
+        self,
+        goods_code: str,
+        language_code: str,
+        ref_date: date
+    ) -> bytes:
+        """发送 goodsDescrForWs 请求，返回响应原始字节"""
+        soap_body = DESCRIPTION_TEMPLATE.render(
+            goods_code=goods_code,
+            language_code=language_code.upper(),
+            reference_date=ref_date.isoformat()
+        )
+        return self._make_soap_request(soap_body)
+    
+    def _request_measures(
+        self,
+        goods_code: str,
+        country_code: str,
+        trade_movement: str,
+        ref_date: date
+    ) -> bytes:
+        """发送 goodsMeasForWs 请求，返回响应原始字节"""
+        soap_body = MEASURES_TEMPLATE.render(
+            goods_code=goods_code,
+            country_code=country_code.upper(),
+            reference_date=ref_date.isoformat(),
+            trade_movement=trade_movement.upper()
+        )
+        return self._make_soap_request(soap_body)
     
     def _mock_description(self, goods_code: str, language_code: str) -> GoodsDescription:
         """Mock 数据: 商品描述"""
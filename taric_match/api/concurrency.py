@@ -0,0 +1,103 @@
+"""并发工具: 限速与有界并发映射"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Iterable, Iterator, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class RateLimiter:
+    """简单的等间隔限速器 (线程安全)
+
+    Args:
+        rate: 每秒最多请求数，<= 0 表示不限速
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self) -> None:
+        """阻塞直到允许发送下一个请求"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(self._next, now) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def bounded_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int = 8,
+    max_in_flight: Optional[int] = None,
+    ordered: bool = False,
+    stop_event: Optional[threading.Event] = None,
+) -> Iterator[Tuple[T, "Future[R]"]]:
+    """
+    并发执行 func 并逐个产出 (输入, 已完成的 Future)
+
+    输入按需从 items 中读取，同时最多 max_in_flight 个任务未被消费；
+    调用方处理变慢时不再读取新的输入 (背压)。生成器关闭时取消未开始的任务。
+
+    Args:
+        func: 任务函数
+        items: 输入，可以是生成器
+        workers: 线程数
+        max_in_flight: 最多未消费任务数，默认 workers * 2
+        ordered: True 按输入顺序产出，False 按完成顺序产出
+        stop_event: 设置后停止读取新的输入
+    """
+    workers = max(1, workers)
+    max_in_flight = max(1, max_in_flight or workers * 2)
+    iterator = iter(items)
+    exhausted = False
+    queue: Deque[Tuple[T, "Future[R]"]] = deque()
+    pending: Set["Future[R]"] = set()
+    inputs = {}
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            while not exhausted and len(queue) + len(pending) < max_in_flight:
+                if stop_event is not None and stop_event.is_set():
+                    exhausted = True
+                    break
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                future = executor.submit(func, item)
+                if ordered:
+                    queue.append((item, future))
+                else:
+                    pending.add(future)
+                    inputs[future] = item
+
+            if ordered:
+                if not queue:
+                    return
+                item, future = queue.popleft()
+                wait([future])
+                yield item, future
+            else:
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield inputs.pop(future), future
+    finally:
+        for _, future in queue:
+            future.cancel()
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
@@ -0,0 +1,204 @@
+"""
+缓存预热
+
+在业务高峰前按编码列表、章/品目前缀或访问频率批量请求 TARIC，
+使高峰期查询全部命中缓存。
+"""
+
+import threading
+from contextlib import nullcontext
+from dataclasses import dataclass, field, replace
+from datetime import date
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from taric_match.utils.profiling import PipelineProfiler
+
+from .cache import ResponseCache
+from .client import TaricClient
+from .concurrency import RateLimiter, bounded_map
+
+# 预热键: (商品编码, 国家代码, 贸易方向, 参考日期)
+PrefetchKey = Tuple[str, str, str, date]
+
+
+@dataclass
+class PrefetchResult:
+    """预热结果统计"""
+
+    total: int = 0
+    fetched: int = 0
+    skipped: int = 0  # 缓存中已存在
+    failed: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def select_codes(
+    cache: ResponseCache,
+    codes: Iterable[str] = (),
+    prefixes: Iterable[str] = (),
+    top: int = 0,
+) -> List[str]:
+    """
+    汇总待预热的商品编码
+
+    Args:
+        cache: 响应缓存 (提供访问统计)
+        codes: 显式指定的商品编码
+        prefixes: 章/品目前缀 (如 "87", "8703")，从历史访问过的编码中筛选
+        top: 追加访问次数最多的前 N 个编码
+
+    Returns:
+        去重后的编码列表，保持输入顺序
+    """
+    selected = [str(code).strip() for code in codes if str(code).strip()]
+
+    prefixes = tuple(p.strip() for p in prefixes if p.strip())
+    if prefixes:
+        for _, goods_code, _, _ in cache.known_keys("measures"):
+            if goods_code.startswith(prefixes):
+                selected.append(goods_code)
+
+    if top > 0:
+        for (_, goods_code, _, _), _ in cache.most_requested(top, "measures"):
+            selected.append(goods_code)
+
+    return list(dict.fromkeys(selected))
+
+
+def build_keys(
+    codes: Sequence[str],
+    countries: Sequence[str],
+    movements: Sequence[str] = ("I",),
+    dates: Sequence[date] = (),
+) -> List[PrefetchKey]:
+    """展开 编码 × 国家 × 贸易方向 × 日期 组合"""
+    dates = list(dates) or [date.today()]
+    return [
+        (code, country.upper(), movement.upper(), ref_date)
+        for ref_date in dates
+        for country in countries
+        for movement in movements
+        for code in codes
+    ]
+
+
+def prefetch(
+    client: TaricClient,
+    keys: Sequence[PrefetchKey],
+    rate: float = 10.0,
+    workers: int = 4,
+    languages: Sequence[str] = (),
+    stop_event: Optional[threading.Event] = None,
+    on_progress: Optional[Callable[[PrefetchResult], None]] = None,
+) -> PrefetchResult:
+    """
+    按限速并发预热缓存
+
+    先清理过期缓存条目，再预热关税措施；指定 languages 时同时预热
+    keys 中每个 (商品编码, 日期) 的商品描述 (供 query 命令使用)。
+
+    Args:
+        client: 启用了缓存的 TaricClient
+        keys: 预热键列表
+        rate: 每秒最多请求数 (API 上限 100，建议远低于此值)
+        workers: 并发线程数
+        languages: 需要预热描述的语言代码
+        stop_event: 设置后停止提交新的请求
+        on_progress: 每完成一个键后在调用线程中回调，参数为统计快照
+
+    设置环境变量 TARIC_PROFILE=<目录> 时，采集工作线程的 cProfile 数据，
+    结束后写出 prefetch.warm.prof 与汇总报告。
+
+    Returns:
+        PrefetchResult 统计
+    """
+    if client.cache is None:
+        raise ValueError("预热需要启用缓存 (cache=ResponseCache(...))")
+    cache = client.cache
+    cache.prune()
+
+    items: List[Tuple[str, tuple]] = [("measures", key) for key in keys]
+    code_dates = dict.fromkeys((code, ref_date) for code, _, _, ref_date in keys)
+    items.extend(
+        ("description", (code, language.upper(), ref_date))
+        for code, ref_date in code_dates
+        for language in languages
+    )
+
+    result = PrefetchResult(total=len(items))
+    limiter = RateLimiter(rate)
+    lock = threading.Lock()
+
+    def warm(item: Tuple[str, tuple]) -> None:
+        operation, key = item
+        if operation == "measures":
+            goods_code, param, movement, ref_date = key
+            warm_func: Callable[..., bool] = client.warm_goods_measures
+        else:
+            goods_code, param, ref_date = key
+            movement = ""
+            warm_func = client.warm_goods_description
+        try:
+            if cache.contains((operation, goods_code, param, movement), ref_date.isoformat()):
+                fetched = False
+            else:
+                limiter.wait()
+                fetched = warm_func(*key)
+            with lock:
+                if fetched:
+                    result.fetched += 1
+                else:
+                    result.skipped += 1
+        except Exception as e:
+            with lock:
+                result.failed += 1
+                result.errors.append(f"{operation} {goods_code}/{param}/{ref_date}: {e}")
+
+    profiler = PipelineProfiler.from_env(prefix="prefetch")
+    profiled = profiler.threaded_phase("warm") if profiler is not None else nullcontext(lambda f: f)
+
+    try:
+        with profiled as wrap:
+            for item, future in bounded_map(wrap(warm), items, workers, stop_event=stop_event):
+                error = future.exception()
+                with lock:
+                    if error is not None:
+                        # warm() 之外的异常 (如性能分析器) 同样计为失败
+                        result.failed += 1
+                        result.errors.append(f"{item[0]} {item[1]}: {error}")
+                    snapshot = replace(result, errors=list(result.errors))
+                if on_progress is not None:
+                    on_progress(snapshot)
+    finally:
+        if profiler is not None and profiler.phases:
+            profiler.write()
+
+    return result
+
+
+class PrefetchJob(threading.Thread):
+    """后台预热任务
+
+    示例:
+        job = PrefetchJob(client, keys, rate=5)
+        job.start()
+        ...
+        job.stop()  # 可选，提前结束
+        job.join()
+        print(job.result)
+    """
+
+    def __init__(self, client: TaricClient, keys: Sequence[PrefetchKey], **kwargs):
+        super().__init__(name="taric-prefetch", daemon=True)
+        self.client = client
+        self.keys = keys
+        self.kwargs = kwargs
+        self.result: Optional[PrefetchResult] = None
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        self.result = prefetch(self.client, self.keys, stop_event=self._stop_event, **self.kwargs)
+
+    def stop(self) -> None:
+        """停止提交新的预热请求"""
+        self._stop_event.set()
@@ -1,5 +1,5 @@
 """CLI 模块"""
 
-from .commands import main, describe, measure
+from .commands import main, query, batch, prefetch
 
-__all__ = ["main", "describe", "measure"]
+__all__ = ["main", "query", "batch", "prefetch"]
@@ -1,12 +1,14 @@
 """CLI 命令"""
 
+import sqlite3
 from datetime import datetime
-from typing import Optional
+from typing import Any, List, Optional, Tuple
 import click
 from rich import print as rprint
 from rich.table import Table
 
-from taric_match.api import TaricClient
+from taric_match.api import GoodsMeasures, ResponseCache, TaricAPIError, TaricClient
+from taric_match.utils import get_cache_dir
 
 
 @click.group()
@@ -15,12 +17,42 @@ from taric_match.api import TaricClient
     default=None,
     help="TARIC API URL",
 )
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    help="是否启用本地响应缓存 (默认启用)",
+)
+@click.option(
+    "--cache-ttl",
+    default=24 * 3600,
+    type=int,
+    help="缓存有效期 (秒)",
+)
 @click.pass_context
-def main(ctx: click.Context, api_url: str):
+def main(ctx: click.Context, api_url: str, cache: bool, cache_ttl: int):
     """taric-match: 欧盟海关关税查询工具"""
     ctx.ensure_object(dict)
     ctx.obj["api_url"] = api_url
-    ctx.obj["client"] = TaricClient(api_url=api_url)
+    ctx.obj["cache"] = cache
+    ctx.obj["cache_ttl"] = cache_ttl
+
+
+def get_client(ctx: click.Context) -> TaricClient:
+    """按需创建客户端；缓存目录不可用时给出警告并不使用缓存"""
+    client: Optional[TaricClient] = ctx.obj.get("client")
+    if client is None:
+        response_cache = None
+        if ctx.obj["cache"]:
+            try:
+                response_cache = ResponseCache(
+                    get_cache_dir() / "responses.sqlite3", ttl=ctx.obj["cache_ttl"]
+                )
+            except (OSError, sqlite3.Error) as e:
+                rprint(f"[yellow]警告: 无法打开本地缓存 ({e})，本次不使用缓存[/yellow]")
+        client = TaricClient(service_url=ctx.obj["api_url"], cache=response_cache)
+        ctx.obj["client"] = client
+        ctx.call_on_close(client.close)
+    return client
 
 
 @main.command("query")
@@ -56,7 +88,7 @@ def query(
     lang: str,
 ):
     """查询商品编码对应的关税措施"""
-    client: TaricClient = ctx.obj["client"]
+    client = get_client(ctx)
     ref_date = date.date() if date else None
 
     try:
@@ -97,7 +129,7 @@ def query(
                 measures_table.add_row(
                     m.measure_type,
                     m.duty_rate or "-",
-                    f"{m.validity_start or ''} - {m.validity_end or ''}",
+                    f"{m.validity_start_date or ''} - {m.validity_end_date or ''}",
                     m.regulation_id or "-"
                 )
             rprint(measures_table)
@@ -125,6 +157,23 @@ def query(
     default="EU",
     help="国家代码",
 )
+@click.option(
+    "--retries",
+    default=2,
+    type=int,
+    help="网络错误或 API 拦截 (如 502) 时的重试次数",
+)
+@click.option(
+    "--progress-interval",
+    default=10.0,
+    type=float,
+    help="非终端输出时进度汇总的间隔 (秒)",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="按阶段采集性能分析数据，写到输出文件旁 (也可设置 TARIC_PROFILE)",
+)
 @click.pass_context
 def batch(
     ctx: click.Context,
@@ -132,17 +181,36 @@ def batch(
     output: str,
     column: str,
     country: str,
+    retries: int,
+    progress_interval: float,
+    profile: bool,
 ):
     """批量查询 Excel 中的商品编码"""
-    import pandas as pd
+    import time
+    from contextlib import nullcontext
     from pathlib import Path
 
-    client: TaricClient = ctx.obj["client"]
+    import pandas as pd
+    import requests
+
+    from taric_match.cli.progress import BatchProgress
+    from taric_match.utils.profiling import PipelineProfiler
+
+    client = get_client(ctx)
+
+    output_path = Path(output)
+    profiler = PipelineProfiler.from_env(prefix=output_path.stem, default_dir=output_path.parent)
+    if profile and profiler is None:
+        profiler = PipelineProfiler(output_path.parent, prefix=output_path.stem)
+
+    def phase(name: str):
+        return profiler.phase(name) if profiler is not None else nullcontext()
 
     try:
         # 读取 Excel
         rprint(f"📖 读取文件: {input_file}")
-        df = pd.read_excel(input_file)
+        with phase("read"):
+            df = pd.read_excel(input_file)
 
         if column not in df.columns:
             rprint(f"[red]错误: 未找到列 '{column}'[/red]")
@@ -154,27 +222,58 @@ def batch(
         rprint(f"📦 共有 {len(codes)} 个商品编码待查询")
 
         # 批量查询
-        results = []
-        for i, code in enumerate(codes, 1):
-            rprint(f"🔍 查询 [{i}/{len(codes)}]: {code}")
+        lookups: List[Tuple[Any, Optional[GoodsMeasures], Optional[Exception]]] = []
+        progress = BatchProgress(len(codes), cache=client.cache, interval=progress_interval)
+        with phase("lookup"), progress:
+            for code in codes:
+                attempts = 0
+                try:
+                    while True:
+                        try:
+                            measures = client.fetch_goods_measures(
+                                goods_code=str(code),
+                                country_code=country.upper(),
+                                trade_movement="I",
+                                reference_date=None
+                            )
+                            break
+                        except (requests.RequestException, TaricAPIError) as e:
+                            # 无返回数据 (无状态码) 不是临时错误，不重试
+                            transient = not isinstance(e, TaricAPIError) or e.status_code is not None
+                            if not transient or attempts >= retries:
+                                raise
+                            attempts += 1
+                            time.sleep(attempts)
+                    lookups.append((code, measures, None))
+                    progress.advance(retries=attempts)
 
-            try:
-                measures = client.get_goods_measures(
-                    goods_code=str(code),
-                    country_code=country.upper(),
-                    trade_movement="I",
-                    reference_date=None
-                )
+                except Exception as e:
+                    lookups.append((code, None, e))
+                    progress.advance(error=True, retries=attempts)
 
-                if measures.measures:
-                    for m in measures.measures:
+        # 整理结果
+        with phase("assemble"):
+            results = []
+            for code, found, error in lookups:
+                if found is None:
+                    results.append({
+                        "商品编码": code,
+                        "措施类型": f"查询失败: {error}",
+                        "税率": "-",
+                        "附加代码": "-",
+                        "有效期起": "-",
+                        "有效期止": "-",
+                        "法规编号": "-",
+                    })
+                elif found.measures:
+                    for m in found.measures:
                         results.append({
                             "商品编码": code,
                             "措施类型": m.measure_type,
                             "税率": m.duty_rate or "-",
                             "附加代码": m.additional_code or "-",
-                            "有效期起": m.validity_start or "-",
-                            "有效期止": m.validity_end or "-",
+                            "有效期起": m.validity_start_date or "-",
+                            "有效期止": m.validity_end_date or "-",
                             "法规编号": m.regulation_id or "-",
                         })
                 else:
@@ -187,26 +286,134 @@ def batch(
                         "有效期止": "-",
                         "法规编号": "-",
                     })
-
-            except Exception as e:
-                results.append({
-                    "商品编码": code,
-                    "措施类型": f"查询失败: {e}",
-                    "税率": "-",
-                    "附加代码": "-",
-                    "有效期起": "-",
-                    "有效期止": "-",
-                    "法规编号": "-",
-                })
+            result_df = pd.DataFrame(results)
 
         # 保存结果
-        result_df = pd.DataFrame(results)
-        result_df.to_excel(output, index=False)
+        with phase("write"):
+            result_df.to_excel(output, index=False)
         rprint(f"✅ 结果已保存到: {output}")
 
     except Exception as e:
         rprint(f"[red]错误: {e}[/red]")
 
+    finally:
+        if profiler is not None and profiler.phases:
+            paths = profiler.write()
+            rprint(f"⏱️  性能分析已保存: {paths[-1]}")
+            for name, duration in profiler.durations.items():
+                rprint(f"   {name}: {duration:.3f}s")
+
+
+@main.command("prefetch")
+@click.argument("codes", nargs=-1)
+@click.option(
+    "--from-file",
+    type=click.Path(exists=True),
+    help="商品编码列表文件 (每行一个)",
+)
+@click.option(
+    "--prefix",
+    multiple=True,
+    help="章/品目前缀 (如 87, 8703)，从历史访问过的编码中筛选，可重复",
+)
+@click.option(
+    "--top",
+    default=0,
+    type=int,
+    help="追加访问次数最多的前 N 个编码",
+)
+@click.option(
+    "--country",
+    multiple=True,
+    default=["EU"],
+    help="国家代码，可重复",
+)
+@click.option(
+    "--movement",
+    multiple=True,
+    default=["I"],
+    type=click.Choice(["I", "E", "IE"]),
+    help="贸易方向，可重复",
+)
+@click.option(
+    "--date",
+    "dates",
+    multiple=True,
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    help="参考日期 (YYYY-MM-DD)，可重复，默认当天",
+)
+@click.option(
+    "--lang",
+    multiple=True,
+    default=["EN"],
+    help="同时预热该语言的商品描述 (供 query 使用)，可重复",
+)
+@click.option(
+    "--rate",
+    default=10.0,
+    type=float,
+    help="每秒最多请求数",
+)
+@click.option(
+    "--workers",
+    default=4,
+    type=int,
+    help="并发线程数",
+)
+@click.pass_context
+def prefetch(
+    ctx: click.Context,
+    codes: tuple,
+    from_file: Optional[str],
+    prefix: tuple,
+    top: int,
+    country: tuple,
+    movement: tuple,
+    dates: tuple,
+    lang: tuple,
+    rate: float,
+    workers: int,
+):
+    """预热本地缓存，使高峰期查询命中缓存
+
+    适合通过 cron / systemd timer 在高峰前定时运行。
+    """
+    from taric_match.api.prefetch import build_keys, prefetch as run_prefetch, select_codes
+
+    client = get_client(ctx)
+    if client.cache is None:
+        rprint("[red]错误: 预热需要启用缓存 (请去掉 --no-cache)[/red]")
+        return
+
+    all_codes = list(codes)
+    if from_file:
+        with open(from_file, encoding="utf-8") as f:
+            all_codes.extend(line.strip() for line in f if line.strip())
+
+    selected = select_codes(client.cache, all_codes, prefix, top)
+    if not selected:
+        rprint("[yellow]没有需要预热的商品编码[/yellow]")
+        return
+
+    keys = build_keys(
+        selected,
+        countries=country,
+        movements=movement,
+        dates=[d.date() for d in dates],
+    )
+    rprint(
+        f"🔥 预热 {len(selected)} 个编码: {len(keys)} 个关税措施查询"
+        f"{', 描述语言 ' + '/'.join(lang) if lang else ''} (限速 {rate}/s)"
+    )
+
+    result = run_prefetch(client, keys, rate=rate, workers=workers, languages=lang)
+
+    rprint(
+        f"✅ 完成: 新缓存 {result.fetched}, 已存在 {result.skipped}, 失败 {result.failed}"
+    )
+    for error in result.errors[:10]:
+        rprint(f"[red]  {error}[/red]")
+
 
 @main.command("version")
 def version():
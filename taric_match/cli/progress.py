@@ -0,0 +1,146 @@
+"""批量查询进度显示"""
+
+import time
+from typing import Optional
+
+from rich.console import Console
+from rich.progress import (
+    BarColumn,
+    MofNCompleteColumn,
+    Progress,
+    TaskID,
+    TextColumn,
+    TimeRemainingColumn,
+)
+
+from taric_match.api import ResponseCache
+
+
+class BatchProgress:
+    """低开销的批量进度显示
+
+    终端下使用 rich 进度条 (限频刷新)；非终端 (管道/日志) 下
+    每隔 interval 秒输出一行汇总。渲染开销与批量大小无关。
+
+    Args:
+        total: 总数
+        console: rich Console (默认新建)
+        cache: 响应缓存，用于统计本次运行的命中率
+        interval: 非终端模式下的汇总间隔 (秒)
+        description: 进度条标题
+    """
+
+    # 终端模式下统计字段的更新间隔 (秒)
+    FIELD_UPDATE_INTERVAL = 0.25
+
+    def __init__(
+        self,
+        total: int,
+        console: Optional[Console] = None,
+        cache: Optional[ResponseCache] = None,
+        interval: float = 10.0,
+        description: str = "🔍 查询",
+    ):
+        self.total = total
+        self.console = console or Console()
+        self.cache = cache
+        self.interval = interval
+        self.description = description
+
+        self.completed = 0
+        self.errors = 0
+        self.retries = 0
+
+        self._start = 0.0
+        self._last_emit = 0.0
+        self._cache_base = (0, 0)
+        self._progress: Optional[Progress] = None
+        self._task: Optional[TaskID] = None
+
+    def __enter__(self) -> "BatchProgress":
+        self._start = self._last_emit = time.monotonic()
+        if self.cache is not None:
+            self._cache_base = (self.cache.hits, self.cache.misses)
+        if self.console.is_terminal:
+            self._progress = Progress(
+                TextColumn("{task.description}"),
+                BarColumn(),
+                MofNCompleteColumn(),
+                TextColumn("{task.fields[stats]}"),
+                TimeRemainingColumn(),
+                console=self.console,
+                refresh_per_second=4,
+            )
+            self._progress.start()
+            self._task = self._progress.add_task(
+                self.description, total=self.total, stats=self._live_text()
+            )
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._progress is not None and self._task is not None:
+            self._progress.update(self._task, completed=self.completed, stats=self._live_text())
+            self._progress.stop()
+        self.console.print(self.summary(), highlight=False, soft_wrap=True)
+
+    def advance(self, error: bool = False, retries: int = 0) -> None:
+        """记录完成一项"""
+        self.completed += 1
+        if error:
+            self.errors += 1
+        self.retries += retries
+
+        now = time.monotonic()
+        if self._progress is not None and self._task is not None:
+            if now - self._last_emit >= self.FIELD_UPDATE_INTERVAL:
+                self._last_emit = now
+                self._progress.update(
+                    self._task, completed=self.completed, stats=self._live_text()
+                )
+            else:
+                self._progress.update(self._task, completed=self.completed)
+        elif now - self._last_emit >= self.interval:
+            self._last_emit = now
+            self.console.print(self.summary(), highlight=False, soft_wrap=True)
+
+    @property
+    def hit_ratio(self) -> Optional[float]:
+        """本次运行的缓存命中率，未启用缓存时为 None"""
+        if self.cache is None:
+            return None
+        hits = self.cache.hits - self._cache_base[0]
+        misses = self.cache.misses - self._cache_base[1]
+        if hits + misses == 0:
+            return None
+        return hits / (hits + misses)
+
+    @property
+    def rate(self) -> float:
+        """吞吐量 (项/秒)"""
+        elapsed = time.monotonic() - self._start
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    def _live_text(self) -> str:
+        return f"{self.rate:.1f}/s | {self._stats_text()}"
+
+    def _stats_text(self) -> str:
+        text = f"错误 {self.errors} | 重试 {self.retries}"
+        ratio = self.hit_ratio
+        if ratio is not None:
+            text += f" | 缓存命中 {ratio:.1%}"
+        return text
+
+    def summary(self) -> str:
+        """单行汇总: 进度、吞吐量、剩余时间、错误/重试数、缓存命中率"""
+        rate = self.rate
+        percent = self.completed / self.total if self.total else 1.0
+        if rate > 0:
+            minutes, seconds = divmod(int((self.total - self.completed) / rate), 60)
+            hours, minutes = divmod(minutes, 60)
+            eta = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        else:
+            eta = "--:--:--"
+        return (
+            f"{self.description} {self.completed}/{self.total} ({percent:.1%}) | "
+            f"{rate:.1f}/s | ETA {eta} | {self._stats_text()}"
+        )
@@ -0,0 +1,195 @@
+"""流水线分阶段性能分析"""
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
+
+F = TypeVar("F", bound=Callable)
+
+# 环境变量: 设置为输出目录 (或 "1" 表示输出文件所在目录/当前目录) 即启用分析
+PROFILE_ENV = "TARIC_PROFILE"
+
+# 按文件路径/函数名归类自身耗时，便于判断瓶颈来源
+CATEGORIES: List[Tuple[str, Tuple[str, ...]]] = [
+    ("网络", ("requests", "urllib3", "socket", "ssl", "http/client")),
+    ("XML 解析", ("_parse_", "ElementTree", "xml/etree")),
+    ("pandas", ("pandas",)),
+    ("openpyxl", ("openpyxl",)),
+    ("缓存", ("sqlite3", "cache.py")),
+]
+
+# Python 3.12+ 的 cProfile 基于 sys.monitoring: 每个解释器同时只能启用一个 Profile，
+# 且它记录所有线程；更早的版本只记录启用它的线程
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+
+class PipelineProfiler:
+    """按阶段采集 cProfile 数据
+
+    每个阶段写出一个 `.prof` 文件 (可用 snakeviz / pstats / gprof2dot 打开)，
+    并汇总一份 top-N 热点文本报告。
+
+    并发阶段使用 threaded_phase()：Python 3.12 之前 cProfile 只分析启用它的线程，
+    在每个工作线程内分别采集、写出时合并，耗时为各线程耗时之和；
+    3.12+ 由协调线程启用一个 Profile 覆盖整个阶段，它同时记录所有工作线程。
+    同一线程内嵌套的阶段计入外层阶段；已有其他分析器运行时 phase() 不采集数据。
+
+    示例:
+        profiler = PipelineProfiler("out", prefix="result")
+        with profiler.phase("read"):
+            ...
+        profiler.write()
+
+    Args:
+        output_dir: 输出目录
+        prefix: 输出文件名前缀
+        top: 每个阶段报告的热点函数数量
+    """
+
+    def __init__(self, output_dir: Union[str, Path] = ".", prefix: str = "taric", top: int = 15):
+        self.output_dir = Path(output_dir)
+        self.prefix = prefix
+        self.top = top
+        self.phases: Dict[str, List[cProfile.Profile]] = {}
+        self.durations: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(
+        cls, prefix: str = "taric", default_dir: Union[str, Path, None] = None
+    ) -> Optional["PipelineProfiler"]:
+        """
+        根据 TARIC_PROFILE 环境变量创建，未设置时返回 None
+
+        TARIC_PROFILE 为目录时写到该目录；为 "1"/"true" 时写到 default_dir
+        (通常是输出文件所在目录)，未提供则写到当前目录。
+        """
+        value = os.environ.get(PROFILE_ENV, "").strip()
+        if not value or value.lower() in ("0", "false"):
+            return None
+        if value.lower() in ("1", "true"):
+            return cls(default_dir if default_dir is not None else ".", prefix=prefix)
+        return cls(value, prefix=prefix)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """分析一个阶段；同名阶段多次进入时累计"""
+        if getattr(self._local, "active", False):
+            # 本线程已有阶段在分析 (cProfile 不能嵌套启用)
+            yield
+            return
+
+        profiles: Dict[str, cProfile.Profile] = getattr(self._local, "profiles", None) or {}
+        self._local.profiles = profiles
+        profile = profiles.get(name) or cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 3.12+ 已有其他分析器 (其他线程的阶段或外部工具) 在运行
+            yield
+            return
+        if name not in profiles:
+            profiles[name] = profile
+            with self._lock:
+                self.phases.setdefault(name, []).append(profile)
+
+        self._local.active = True
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - start
+            self._local.active = False
+            with self._lock:
+                self.durations[name] = self.durations.get(name, 0.0) + elapsed
+
+    @contextmanager
+    def threaded_phase(self, name: str) -> Iterator[Callable[[F], F]]:
+        """
+        分析由工作线程执行的阶段，在协调线程中进入
+
+        产出 wrap(func)，用于包装提交给线程池的任务函数。3.12 之前包装后的
+        函数在工作线程内进入 phase()；3.12+ 由本上下文统一采集，wrap 原样返回。
+
+        示例:
+            with profiler.threaded_phase("lookup") as wrap:
+                for item, future in bounded_map(wrap(func), items):
+                    ...
+        """
+        if not PER_THREAD_PROFILES:
+            with self.phase(name):
+                yield lambda func: func
+            return
+
+        def wrap(func: F) -> F:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.phase(name):
+                    return func(*args, **kwargs)
+
+            return wrapper  # type: ignore[return-value]
+
+        yield wrap
+
+    def stats(self, name: str) -> pstats.Stats:
+        """合并各线程的数据，返回某阶段的 pstats.Stats"""
+        with self._lock:
+            profiles = list(self.phases[name])
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def categorize(self, name: str) -> Dict[str, float]:
+        """按类别汇总某阶段的函数自身耗时 (秒)"""
+        stats = self.stats(name)
+        totals: Dict[str, float] = {}
+        for (filename, _, funcname), (_, _, tottime, _, _) in stats.stats.items():  # type: ignore[attr-defined]
+            location = f"{filename}:{funcname}".replace("\\", "/")
+            for category, patterns in CATEGORIES:
+                if any(pattern in location for pattern in patterns):
+                    totals[category] = totals.get(category, 0.0) + tottime
+                    break
+            else:
+                totals["其他"] = totals.get("其他", 0.0) + tottime
+        return totals
+
+    def summary(self) -> str:
+        """生成各阶段耗时、类别占比与 top-N 热点的文本报告"""
+        buf = io.StringIO()
+        buf.write("阶段耗时:\n")
+        for name, duration in self.durations.items():
+            buf.write(f"  {name:<10} {duration:8.3f}s\n")
+
+        for name in self.phases:
+            buf.write(f"\n===== {name} ({self.durations[name]:.3f}s) =====\n")
+            categories = sorted(self.categorize(name).items(), key=lambda item: -item[1])
+            buf.write("  " + ", ".join(f"{c} {t:.3f}s" for c, t in categories) + "\n")
+            stats = self.stats(name)
+            stats.stream = buf  # type: ignore[attr-defined]
+            stats.sort_stats("cumulative").print_stats(self.top)
+        return buf.getvalue()
+
+    def write(self) -> List[Path]:
+        """写出每个阶段的 .prof 文件与汇总报告，返回文件路径列表"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for name in self.phases:
+            path = self.output_dir / f"{self.prefix}.{name}.prof"
+            self.stats(name).dump_stats(str(path))
+            paths.append(path)
+
+        summary_path = self.output_dir / f"{self.prefix}.profile.txt"
+        summary_path.write_text(self.summary(), encoding="utf-8")
+        paths.append(summary_path)
+        return paths
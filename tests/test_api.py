@@ -1,13 +1,18 @@
 """API 客户端测试"""
 
 import pytest
+from contextlib import contextmanager
 from datetime import date
 from taric_match.api import (
     TaricClient,
     GoodsDescription,
     GoodsMeasures,
-    Measure
+    Measure,
+    ResponseCache,
+    TaricAPIError,
 )
+from taric_match.api.client import MEASURES_TEMPLATE
+from taric_match.api.prefetch import build_keys, prefetch, select_codes
 
 
 class TestGoodsDescription:
@@ -64,3 +69,287 @@ class TestTaricClient:
         custom_url = "https://custom.api/taric"
         client = TaricClient(api_url=custom_url)
         assert client.api_url == custom_url
+
+
+MEASURES_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ns="http://goodsNomenclatureForWS.ws.taric.dds.s/">
+  <soapenv:Body>
+    <ns:goodsMeasForWsResponse>
+      <return>
+        <goodsCode>87032319</goodsCode>
+        <countryCode>CN</countryCode>
+        <referenceDate>2024-01-15</referenceDate>
+        <tradeMovement>I</tradeMovement>
+        <measureList>
+          <measure>
+            <measureType>103</measureType>
+            <dutyRate>10%</dutyRate>
+          </measure>
+        </measureList>
+      </return>
+    </ns:goodsMeasForWsResponse>
+  </soapenv:Body>
+</soapenv:Envelope>"""
+
+
+DESCRIPTION_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/">
+  <soapenv:Body>
+    <goodsDescrForWsResponse>
+      <return>
+        <goodsCode>87032319</goodsCode>
+        <languageCode>EN</languageCode>
+        <referenceDate>2024-01-15</referenceDate>
+        <description>Motor vehicles</description>
+      </return>
+    </goodsDescrForWsResponse>
+  </soapenv:Body>
+</soapenv:Envelope>"""
+
+
+class TestResponseCache:
+    """响应缓存测试"""
+
+    def test_get_put(self):
+        """测试读写缓存并记录访问"""
+        cache = ResponseCache()
+        key = ("measures", "87032319", "CN", "I")
+        assert cache.get(key, "2024-01-15") is None
+        cache.put(key, "2024-01-15", b"<xml/>")
+        assert cache.get(key, "2024-01-15") == b"<xml/>"
+        assert cache.get(key, "2024-01-16") is None
+        assert cache.most_requested(1) == [(key, 3)]
+
+    def test_prune(self):
+        """测试清理过期条目"""
+        cache = ResponseCache(ttl=3600)
+        key = ("measures", "87032319", "CN", "I")
+        cache.put(key, "2024-01-15", b"<xml/>")
+        assert cache.prune() == 0
+        cache.ttl = -1
+        assert cache.prune() == 1
+        assert cache.stats()["entries"] == 0
+
+    def test_ttl_expired(self):
+        """测试过期缓存不返回"""
+        cache = ResponseCache(ttl=-1)
+        key = ("measures", "87032319", "CN", "I")
+        cache.put(key, "2024-01-15", b"<xml/>")
+        assert cache.get(key, "2024-01-15") is None
+        assert not cache.contains(key, "2024-01-15")
+
+    def test_client_uses_cache(self, monkeypatch):
+        """测试第二次查询命中缓存"""
+        client = TaricClient(cache=ResponseCache())
+        calls = []
+        monkeypatch.setattr(
+            client, "_make_soap_request", lambda body: calls.append(body) or MEASURES_XML
+        )
+        first = client.get_goods_measures("87032319", "CN", reference_date=date(2024, 1, 15))
+        second = client.get_goods_measures("87032319", "CN", reference_date=date(2024, 1, 15))
+        assert len(calls) == 1
+        assert first == second
+        assert second.measures[0].duty_rate == "10%"
+
+
+class _BrokenProfiler:
+    """包装后的任务总是失败的性能分析器"""
+
+    phases: dict = {}
+
+    @contextmanager
+    def threaded_phase(self, name):
+        def broken(item):
+            raise ValueError("Another profiling tool is already active")
+
+        yield lambda func: broken
+
+
+class TestPrefetch:
+    """缓存预热测试"""
+
+    def test_select_codes(self):
+        """测试按编码、前缀和访问频率选择"""
+        cache = ResponseCache()
+        for code, count in [("87032319", 3), ("87039000", 1), ("85171300", 2)]:
+            for _ in range(count):
+                cache.get(("measures", code, "CN", "I"), "2024-01-15")
+        assert select_codes(cache, ["84713000"], ["8703"]) == ["84713000", "87032319", "87039000"]
+        assert select_codes(cache, top=2) == ["87032319", "85171300"]
+
+    def test_prefetch_warms_cache(self, monkeypatch):
+        """测试预热后查询命中缓存，且不计入访问统计"""
+        cache = ResponseCache()
+        client = TaricClient(cache=cache)
+        calls = []
+        monkeypatch.setattr(
+            client, "_make_soap_request", lambda body: calls.append(body) or MEASURES_XML
+        )
+        keys = build_keys(["87032319"], ["CN"], dates=[date(2024, 1, 15)])
+        result = prefetch(client, keys, rate=0)
+        assert (result.fetched, result.skipped, result.failed) == (1, 0, 0)
+        assert cache.stats()["requests"] == 0
+
+        result = prefetch(client, keys, rate=0)
+        assert (result.fetched, result.skipped) == (0, 1)
+
+        client.get_goods_measures("87032319", "CN", reference_date=date(2024, 1, 15))
+        assert len(calls) == 1
+
+    def test_prefetch_descriptions(self, monkeypatch):
+        """测试同时预热商品描述"""
+        client = TaricClient(cache=ResponseCache())
+        responses = {b"goodsMeasForWs": MEASURES_XML, b"goodsDescrForWs": DESCRIPTION_XML}
+        calls = []
+
+        def fake_request(body):
+            calls.append(body)
+            return next(v for k, v in responses.items() if k in body)
+
+        monkeypatch.setattr(client, "_make_soap_request", fake_request)
+        keys = build_keys(["87032319"], ["CN", "US"], dates=[date(2024, 1, 15)])
+        result = prefetch(client, keys, rate=0, languages=["en"])
+        assert (result.total, result.fetched, result.failed) == (3, 3, 0)
+
+        desc = client.get_goods_description("87032319", "EN", date(2024, 1, 15))
+        assert desc.description == "Motor vehicles"
+        assert len(calls) == 3
+
+    def test_prefetch_counts_escaped_errors(self, monkeypatch):
+        """测试 warm() 之外抛出的异常计为失败，统计总数一致"""
+        client = TaricClient(cache=ResponseCache())
+        monkeypatch.setattr(client, "_make_soap_request", lambda body: MEASURES_XML)
+        monkeypatch.setattr(
+            "taric_match.api.prefetch.PipelineProfiler.from_env",
+            lambda prefix: _BrokenProfiler(),
+        )
+        keys = build_keys(["1", "2", "3"], ["CN"], dates=[date(2024, 1, 15)])
+        snapshots = []
+        result = prefetch(client, keys, rate=0, on_progress=snapshots.append)
+
+        assert (result.fetched, result.skipped, result.failed) == (0, 0, 3)
+        assert len(snapshots) == 3
+        assert snapshots[0] is not result
+        assert snapshots[-1].failed == 3
+
+
+class TestIterGoodsMeasures:
+    """批量流式查询测试"""
+
+    def test_dedupe_and_generator_input(self):
+        """测试生成器输入与重复键去重"""
+        client = TaricClient(use_mock=True)
+        keys = (
+            (code, "cn", "i", date(2024, 1, 15))
+            for code in ["87032319", "85171300", "87032319"]
+        )
+        results = list(client.iter_goods_measures(keys, workers=2, ordered=True))
+        assert [key for key, _ in results] == [
+            ("87032319", "CN", "I", date(2024, 1, 15)),
+            ("85171300", "CN", "I", date(2024, 1, 15)),
+        ]
+        assert results[0][1].measures[0].duty_rate == "10%"
+
+    def test_backpressure(self):
+        """测试未消费结果数有上限"""
+        client = TaricClient(use_mock=True)
+        consumed = []
+
+        def keys():
+            for i in range(100):
+                assert i - len(consumed) <= 4
+                yield (str(i), "CN", "I", None)
+
+        for key, _ in client.iter_goods_measures(keys(), workers=2, max_in_flight=4):
+            consumed.append(key)
+        assert len(consumed) == 100
+
+    def test_return_exceptions(self, monkeypatch):
+        """测试异常作为结果产出或直接抛出"""
+        client = TaricClient()
+        monkeypatch.setattr(client, "_make_soap_request", lambda body: b"<not-xml")
+        keys = [("87032319", "CN", "I", None)]
+
+        results = list(client.iter_goods_measures(keys, return_exceptions=True))
+        assert isinstance(results[0][1], Exception)
+
+        with pytest.raises(Exception):
+            list(client.iter_goods_measures(keys))
+
+    def test_api_error_not_replaced_by_mock(self, monkeypatch):
+        """测试 502 等 API 错误作为异常产出，而不是 mock 数据"""
+        client = TaricClient()
+
+        def blocked(body):
+            raise TaricAPIError("blocked", status_code=502)
+
+        monkeypatch.setattr(client, "_make_soap_request", blocked)
+        keys = [("87032319", "CN", "I", None)]
+
+        results = list(client.iter_goods_measures(keys, return_exceptions=True))
+        assert isinstance(results[0][1], TaricAPIError)
+        assert results[0][1].status_code == 502
+
+        with pytest.raises(TaricAPIError):
+            list(client.iter_goods_measures(keys))
+
+    def test_dedupe_window(self):
+        """测试去重窗口有上限，且可以关闭"""
+        client = TaricClient(use_mock=True)
+        keys = [(code, "CN", "I", date(2024, 1, 15)) for code in ["1", "2", "3", "1", "3"]]
+
+        codes = [k[0] for k, _ in client.iter_goods_measures(keys, ordered=True, dedupe_window=2)]
+        assert codes == ["1", "2", "3", "1"]
+
+        codes = [k[0] for k, _ in client.iter_goods_measures(keys, ordered=True, dedupe_window=0)]
+        assert codes == ["1", "2", "3", "1", "3"]
+
+    def test_rate_limit_skips_cache_hits(self, monkeypatch):
+        """测试缓存命中不受限速"""
+        import time
+
+        cache = ResponseCache()
+        client = TaricClient(cache=cache)
+        monkeypatch.setattr(client, "_make_soap_request", lambda body: MEASURES_XML)
+        for i in range(20):
+            cache.put(("measures", str(i), "CN", "I"), "2024-01-15", MEASURES_XML)
+
+        keys = [(str(i), "CN", "I", date(2024, 1, 15)) for i in range(20)]
+        start = time.monotonic()
+        results = list(client.iter_goods_measures(keys, rate=2))
+        assert len(results) == 20
+        assert time.monotonic() - start < 1
+
+
+class TestSoapTemplate:
+    """SOAP 请求模板测试"""
+
+    def test_render_escapes_parameters(self):
+        """测试参数 XML 转义且结果为可解析的字节"""
+        import xml.etree.ElementTree as ET
+
+        body = MEASURES_TEMPLATE.render(
+            goods_code="8703</goodsCode><x>",
+            country_code="CN",
+            reference_date="2024-01-15",
+            trade_movement="I",
+        )
+        assert isinstance(body, bytes)
+        root = ET.fromstring(body)
+        assert root.find(".//goodsCode").text == "8703</goodsCode><x>"
+
+
+    def test_goods_code_not_memoized(self):
+        """测试只缓存低基数字段，商品编码不进入缓存"""
+        from taric_match.api.client import _encode_cached_param
+
+        _encode_cached_param.cache_clear()
+        for code in ("87032319", "87032390", "87032410"):
+            MEASURES_TEMPLATE.render(
+                goods_code=code,
+                country_code="CN",
+                reference_date="2024-01-15",
+                trade_movement="I",
+            )
+        info = _encode_cached_param.cache_info()
+        assert (info.currsize, info.hits) == (3, 6)
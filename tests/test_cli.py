@@ -0,0 +1,91 @@
+"""CLI 测试"""
+
+import io
+
+from rich.console import Console
+
+from taric_match.api import ResponseCache
+from taric_match.cli.progress import BatchProgress
+
+
+class TestBatchProgress:
+    """批量进度显示测试"""
+
+    def test_non_terminal_summary(self):
+        """测试非终端模式只输出汇总行"""
+        output = io.StringIO()
+        console = Console(file=output, force_terminal=False)
+        cache = ResponseCache()
+        key = ("measures", "87032319", "CN", "I")
+        cache.put(key, "2024-01-15", b"<xml/>")
+
+        with BatchProgress(1000, console=console, cache=cache, interval=3600) as progress:
+            for i in range(1000):
+                cache.get(key, "2024-01-15" if i % 2 else "2024-01-16")
+                progress.advance(error=i % 100 == 0, retries=1 if i % 250 == 0 else 0)
+
+        lines = output.getvalue().splitlines()
+        assert len(lines) == 1
+        assert "1000/1000" in lines[0]
+        assert "错误 10" in lines[0]
+        assert "重试 4" in lines[0]
+        assert "缓存命中 50.0%" in lines[0]
+
+    def test_terminal_shows_throughput(self):
+        """测试终端模式的进度条显示吞吐量"""
+        output = io.StringIO()
+        console = Console(file=output, force_terminal=True, width=200)
+
+        with BatchProgress(10, console=console) as progress:
+            for i in range(10):
+                progress.advance(error=i == 0)
+
+        text = output.getvalue()
+        assert "━" in text
+        assert "/s | 错误 1 | 重试 0" in text
+
+
+class TestCommands:
+    """CLI 命令测试"""
+
+    def test_version_does_not_open_cache(self, monkeypatch, tmp_path):
+        """测试不需要缓存的命令不创建缓存目录"""
+        from click.testing import CliRunner
+
+        from taric_match.cli import main
+
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+        result = CliRunner().invoke(main, ["version"])
+        assert result.exit_code == 0
+        assert not (tmp_path / "cache").exists()
+
+    def test_batch_counts_api_errors(self, monkeypatch, tmp_path):
+        """测试 502 拦截被计为错误和重试，而不是返回 mock 数据"""
+        import time
+
+        import pandas as pd
+        from click.testing import CliRunner
+
+        from taric_match.api import TaricAPIError, TaricClient
+        from taric_match.cli import main
+
+        client = TaricClient()
+
+        def blocked(body):
+            raise TaricAPIError("blocked", status_code=502)
+
+        monkeypatch.setattr(client, "_make_soap_request", blocked)
+        monkeypatch.setattr(time, "sleep", lambda seconds: None)
+        input_file = tmp_path / "in.xlsx"
+        output_file = tmp_path / "out.xlsx"
+        pd.DataFrame({"商品编码": ["87032319"]}).to_excel(input_file, index=False)
+
+        result = CliRunner().invoke(
+            main,
+            ["--no-cache", "batch", str(input_file), "-o", str(output_file), "--retries", "1"],
+            obj={"client": client},
+        )
+
+        assert "错误 1 | 重试 1" in result.output
+        rows = pd.read_excel(output_file)
+        assert rows["措施类型"][0].startswith("查询失败")
@@ -0,0 +1,120 @@
+"""工具函数测试"""
+
+import cProfile
+import pstats
+import threading
+from datetime import date
+
+from taric_match.utils.profiling import PipelineProfiler
+
+
+class TestPipelineProfiler:
+    """分阶段性能分析测试"""
+
+    def test_write_phases(self, tmp_path):
+        """测试每个阶段写出可加载的 .prof 文件和汇总报告"""
+        profiler = PipelineProfiler(tmp_path, prefix="result")
+        with profiler.phase("read"):
+            sorted(range(1000))
+        with profiler.phase("lookup"):
+            sum(range(1000))
+
+        paths = profiler.write()
+
+        assert [p.name for p in paths] == [
+            "result.read.prof",
+            "result.lookup.prof",
+            "result.profile.txt",
+        ]
+        assert pstats.Stats(str(paths[0])).total_calls > 0
+        assert "===== lookup" in paths[-1].read_text(encoding="utf-8")
+
+    def test_from_env(self, monkeypatch, tmp_path):
+        """测试通过环境变量启用"""
+        monkeypatch.delenv("TARIC_PROFILE", raising=False)
+        assert PipelineProfiler.from_env() is None
+
+        monkeypatch.setenv("TARIC_PROFILE", str(tmp_path))
+        profiler = PipelineProfiler.from_env(prefix="run")
+        assert profiler.output_dir == tmp_path
+        assert profiler.prefix == "run"
+
+    def test_library_profiles_worker_threads(self, monkeypatch, tmp_path):
+        """测试 TARIC_PROFILE 对库调用生效，且采集到工作线程中的解析耗时"""
+        from taric_match.api import ResponseCache, TaricClient
+        from tests.test_api import MEASURES_XML
+
+        monkeypatch.setenv("TARIC_PROFILE", str(tmp_path))
+        client = TaricClient(cache=ResponseCache())
+        monkeypatch.setattr(client, "_make_soap_request", lambda body: MEASURES_XML)
+
+        keys = [(str(i), "CN", "I", None) for i in range(20)]
+        assert len(list(client.iter_goods_measures(keys, workers=4))) == 20
+
+        stats = pstats.Stats(str(tmp_path / "iter_goods_measures.lookup.prof"))
+        functions = {func for _, _, func in stats.stats}  # type: ignore[attr-defined]
+        assert "_parse_measures_response" in functions
+        assert (tmp_path / "iter_goods_measures.profile.txt").exists()
+
+    def test_concurrent_phases(self, tmp_path):
+        """测试多个线程同时进入阶段不报错 (3.12+ 同时只能启用一个 Profile)"""
+        profiler = PipelineProfiler(tmp_path)
+        barrier = threading.Barrier(4)
+        errors = []
+
+        def work():
+            try:
+                with profiler.phase("work"):
+                    barrier.wait(timeout=5)
+                    sum(range(1000))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert "work" in profiler.durations
+
+    def test_phase_skipped_while_other_profiler_active(self, tmp_path):
+        """测试已有其他分析器运行时阶段不采集，结束后可再次采集"""
+        profiler = PipelineProfiler(tmp_path)
+        other = cProfile.Profile()
+        other.enable()
+        try:
+            with profiler.phase("busy"):
+                sum(range(1000))
+        finally:
+            other.disable()
+
+        with profiler.phase("free"):
+            sorted(range(1000))
+        assert "free" in profiler.phases
+        assert pstats.Stats(str(profiler.write()[-2])).total_calls > 0
+
+    def test_prefetch_profiles_without_errors(self, monkeypatch, tmp_path):
+        """测试 TARIC_PROFILE 下预热不因分析器冲突而失败"""
+        from taric_match.api import ResponseCache, TaricClient
+        from taric_match.api.prefetch import build_keys, prefetch
+        from tests.test_api import MEASURES_XML
+
+        monkeypatch.setenv("TARIC_PROFILE", str(tmp_path))
+        client = TaricClient(cache=ResponseCache())
+        monkeypatch.setattr(client, "_make_soap_request", lambda body: MEASURES_XML)
+
+        keys = build_keys([str(i) for i in range(20)], ["CN"], dates=[date(2024, 1, 15)])
+        result = prefetch(client, keys, rate=0, workers=4)
+
+        assert (result.fetched, result.failed) == (20, 0), result.errors
+        stats = pstats.Stats(str(tmp_path / "prefetch.warm.prof"))
+        functions = {func for _, _, func in stats.stats}  # type: ignore[attr-defined]
+        assert "_parse_measures_response" in functions
+
+    def test_from_env_flag_uses_default_dir(self, monkeypatch, tmp_path):
+        """测试 TARIC_PROFILE=1 时写到输出文件所在目录"""
+        monkeypatch.setenv("TARIC_PROFILE", "1")
+        profiler = PipelineProfiler.from_env(prefix="run", default_dir=tmp_path)
+        assert profiler.output_dir == tmp_path